@@ -0,0 +1,312 @@
+"""Pure validation/normalization stage of the agent import.
+
+Kept free of side effects on import (no Firebase, no FastAPI app) so that
+process-pool workers can load it cheaply.
+"""
+from typing import List
+import os
+import re
+import random
+import hashlib
+import itertools
+import multiprocessing
+import yaml
+from concurrent.futures import ProcessPoolExecutor, wait, as_completed, FIRST_COMPLETED
+
+# Import pipeline tuning - validation/normalization can run across a process pool.
+# Opt-in: only set IMPORT_WORKERS above 1 where that many cores are really
+# available (os.cpu_count() reports host CPUs, not the container's CPU quota)
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "1"))
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "32"))
+# Never fork from the server's threads (inherited locks can deadlock workers)
+IMPORT_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+# Near-duplicate detection - MinHash over word shingles, banded for LSH lookup
+SHINGLE_SIZE = 5
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 16
+NEAR_DUPLICATE_THRESHOLD = 0.8
+MINHASH_PRIME = (1 << 61) - 1
+# Fixed seed so every worker process derives the same permutations
+_minhash_rng = random.Random(1729)
+MINHASH_PARAMS = [
+    (_minhash_rng.randrange(1, MINHASH_PRIME), _minhash_rng.randrange(0, MINHASH_PRIME))
+    for _ in range(MINHASH_PERMUTATIONS)
+]
+
+def parse_subagent_file(content: str):
+    """Parse and validate a Claude subagent file, returning (front_matter, body) or None"""
+    try:
+        # Check for YAML frontmatter
+        if '---' not in content or content.count('---') < 2:
+            return None
+        
+        # Extract frontmatter
+        parts = content.split('---')
+        if len(parts) < 3:
+            return None
+        
+        front_matter = parts[1].strip()
+        body = parts[2].strip()
+        
+        # Parse YAML
+        data = yaml.safe_load(front_matter)
+        if not data:
+            return None
+        
+        # Check for required fields
+        if 'name' not in data or 'description' not in data:
+            return None
+        
+        # Check if it's actually a subagent (not just any markdown)
+        name_lower = data['name'].lower()
+        description_lower = data['description'].lower()
+        
+        # More flexible validation - accept any file with name and description
+        # that has meaningful content and looks like an agent
+        if len(body.strip()) < 50:  # At least 50 characters of content
+            return None
+        
+        # Check if it has agent-like content (instructions, focus areas, etc.)
+        body_lower = body.lower()
+        agent_indicators = ['you are', 'focus', 'approach', 'output', 'specializing', 'expertise']
+        has_agent_content = any(indicator in body_lower for indicator in agent_indicators)
+        
+        if not has_agent_content:
+            return None
+        
+        return data, body
+        
+    except Exception:
+        return None
+
+def is_valid_subagent_file(content: str) -> bool:
+    """Validate if a file is a proper Claude subagent"""
+    return parse_subagent_file(content) is not None
+
+def infer_agent_tools(agent_name: str) -> List[str]:
+    """Intelligently assign tools based on agent type"""
+    agent_name = agent_name.lower()
+    if 'code' in agent_name or 'review' in agent_name:
+        return ['Read', 'Grep', 'Bash', 'Git']
+    elif 'debug' in agent_name:
+        return ['Read', 'Grep', 'Bash', 'Python', 'JavaScript']
+    elif 'python' in agent_name:
+        return ['Read', 'Python', 'Pip', 'Virtualenv']
+    elif 'javascript' in agent_name or 'js' in agent_name:
+        return ['Read', 'JavaScript', 'TypeScript', 'Node.js']
+    elif 'data' in agent_name or 'scientist' in agent_name:
+        return ['Read', 'Python', 'R', 'SQL', 'Jupyter']
+    elif 'ml' in agent_name or 'machine' in agent_name:
+        return ['Read', 'Python', 'TensorFlow', 'PyTorch', 'Scikit-learn']
+    elif 'security' in agent_name or 'audit' in agent_name:
+        return ['Read', 'Grep', 'Bash', 'Security']
+    elif 'devops' in agent_name or 'ops' in agent_name:
+        return ['Read', 'Grep', 'Bash', 'Docker', 'Kubernetes']
+    elif 'content' in agent_name or 'writer' in agent_name:
+        return ['Read', 'Write', 'Markdown', 'HTML']
+    else:
+        return ['Read', 'Grep', 'Bash']
+
+def fingerprint_agent_body(body: str):
+    """Return (exact_hash, minhash_signature) for an agent body"""
+    words = re.findall(r"\w+", body.lower())
+    exact_hash = hashlib.sha256(" ".join(words).encode()).hexdigest()
+    
+    if len(words) <= SHINGLE_SIZE:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big") for s in shingles]
+    
+    signature = [min((a * h + b) % MINHASH_PRIME for h in hashes) for a, b in MINHASH_PARAMS]
+    return exact_hash, signature
+
+def dedupe_agents(results: list):
+    """Collapse exact and near-duplicate agents to one canonical copy each.
+
+    The canonical copy is the one from the most-starred source repository,
+    falling back to discovery order. Distinct agents that would be written to
+    the same file are then resolved the same way, so a low-starred fork can't
+    overwrite a popular original. Returns (canonical, duplicates), with
+    canonical agents in discovery order; each duplicate carries
+    "duplicate_of" (the winning URL) and "duplicate_reason".
+    """
+    # Pool results arrive in completion order; restore discovery order first
+    results = sorted(results, key=lambda r: r.get("index", 0))
+    
+    # Union-find over result indexes
+    parent = list(range(len(results)))
+    
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    
+    def union(i, j):
+        parent[find(i)] = find(j)
+    
+    rows = MINHASH_PERMUTATIONS // MINHASH_BANDS
+    exact_seen = {}
+    buckets = {}
+    for i, result in enumerate(results):
+        # Exact duplicates
+        if result["exact_hash"] in exact_seen:
+            union(i, exact_seen[result["exact_hash"]])
+            continue
+        exact_seen[result["exact_hash"]] = i
+        
+        # Near duplicates - only compare against candidates sharing an LSH band
+        signature = result["minhash"]
+        candidates = set()
+        for band in range(MINHASH_BANDS):
+            key = (band, tuple(signature[band * rows:(band + 1) * rows]))
+            candidates.update(buckets.setdefault(key, []))
+            buckets[key].append(i)
+        for j in candidates:
+            if find(i) == find(j):
+                continue
+            other = results[j]["minhash"]
+            similarity = sum(x == y for x, y in zip(signature, other)) / MINHASH_PERMUTATIONS
+            if similarity >= NEAR_DUPLICATE_THRESHOLD:
+                union(i, j)
+    
+    clusters = {}
+    for i in range(len(results)):
+        clusters.setdefault(find(i), []).append(i)
+    
+    def preferred(members):
+        return max(members, key=lambda i: (results[i].get("stars", 0), -i))
+    
+    duplicates = []
+    
+    def mark_duplicates(members, best, reason):
+        for i in members:
+            if i != best:
+                duplicates.append(dict(results[i], duplicate_of=results[best]["url"], duplicate_reason=reason))
+    
+    by_filename = {}
+    for members in clusters.values():
+        best = preferred(members)
+        mark_duplicates(members, best, "Duplicate content")
+        by_filename.setdefault(results[best]["filename"], []).append(best)
+    
+    # Different agents with the same name would overwrite each other's file
+    canonical = []
+    for members in by_filename.values():
+        best = preferred(members)
+        mark_duplicates(members, best, "Name collision")
+        canonical.append(best)
+    
+    # Keep discovery order for writes
+    return [results[i] for i in sorted(canonical)], duplicates
+
+def normalize_agent_file(url: str, content: str) -> dict:
+    """Validate and normalize a fetched agent file.
+
+    Pure function (no I/O) so it can run in a worker process. Returns a dict with
+    either the normalized agent or a "skipped"/"error" reason for the writer.
+    """
+    try:
+        # Check if it has YAML frontmatter (basic validation)
+        if '---' not in content or content.count('---') < 2:
+            return {"url": url, "skipped": "No YAML frontmatter found"}
+        
+        # Validate if this is actually a subagent file
+        parsed = parse_subagent_file(content)
+        if parsed is None:
+            return {"url": url, "skipped": "Not a valid Claude subagent file"}
+        data, body = parsed
+        
+        # Add default tools if not present
+        if 'tools' not in data:
+            data['tools'] = infer_agent_tools(data['name'])
+        
+        # Ensure tools is always a list
+        if isinstance(data['tools'], str):
+            # Convert comma-separated string to list
+            data['tools'] = [tool.strip() for tool in data['tools'].split(',')]
+        elif not isinstance(data['tools'], list):
+            data['tools'] = ['Read', 'Grep', 'Bash']  # Default fallback
+        
+        # Create filename with proper naming
+        filename = f"community_agents/{data['name'].lower().replace(' ', '-').replace('_', '-')}.md"
+        
+        # Reconstruct the content with proper YAML
+        new_content = f"---\nname: {data['name']}\ndescription: {data['description']}\ntools:\n"
+        for tool in data['tools']:
+            new_content += f"  - {tool}\n"
+        new_content += f"---\n\n{body}"
+        
+        exact_hash, minhash = fingerprint_agent_body(body)
+        
+        return {
+            "url": url,
+            "name": data['name'],
+            "description": data['description'],
+            "tools": data['tools'],
+            "filename": filename,
+            "content": new_content,
+            "exact_hash": exact_hash,
+            "minhash": minhash
+        }
+    except Exception as e:
+        return {"url": url, "error": str(e)}
+
+def normalize_agent_item(item):
+    """Normalize a (url, content[, source]) item, tagging the result with its source info"""
+    url, content, *source = item
+    result = normalize_agent_file(url, content)
+    if source:
+        result.update(source[0])
+    return result
+
+def normalize_agent_batch(batch):
+    """Normalize a chunk of fetched items in a worker process"""
+    return [normalize_agent_item(item) for item in batch]
+
+def normalize_agent_files(items, workers: int = None, chunk_size: int = None):
+    """Normalize fetched (url, content[, source]) items across a process pool.
+
+    Items are submitted in chunks as they arrive and results are yielded as each
+    chunk completes, so the caller can keep writing while workers validate.
+    Batches smaller than one chunk per worker are normalized in-process, since
+    starting the pool would cost more than it saves.
+    """
+    workers = workers or IMPORT_WORKERS
+    chunk_size = chunk_size or IMPORT_CHUNK_SIZE
+    
+    if workers <= 1:
+        for item in items:
+            yield normalize_agent_item(item)
+        return
+    
+    items = iter(items)
+    head = list(itertools.islice(items, workers * chunk_size))
+    if len(head) < workers * chunk_size:
+        for item in head:
+            yield normalize_agent_item(item)
+        return
+    
+    mp_context = multiprocessing.get_context(IMPORT_START_METHOD)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as executor:
+        pending = set()
+        batch = []
+        for item in itertools.chain(head, items):
+            batch.append(item)
+            if len(batch) < chunk_size:
+                continue
+            pending.add(executor.submit(normalize_agent_batch, batch))
+            batch = []
+            
+            # Hand back finished chunks; block only when too much work is queued
+            timeout = None if len(pending) >= workers * 2 else 0
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+        
+        if batch:
+            pending.add(executor.submit(normalize_agent_batch, batch))
+        for future in as_completed(pending):
+            yield from future.result()
@@ -14,6 +14,11 @@ import json
 import schedule
 import threading
 import time
+import re
+import math
+import functools
+from collections import OrderedDict
+from agent_pipeline import dedupe_agents, normalize_agent_files
 
 # --- Firebase Setup ---
 cred_path = os.getenv("FIREBASE_CREDENTIALS", "firebase-admin-key.json")
@@ -78,54 +83,28 @@ GITHUB_SEARCH_PATTERNS = [
     "anthropic subagent filename:*.md"
 ]
 
-def is_valid_subagent_file(content: str) -> bool:
-    """Validate if a file is a proper Claude subagent"""
-    try:
-        # Check for YAML frontmatter
-        if '---' not in content or content.count('---') < 2:
-            return False
-        
-        # Extract frontmatter
-        parts = content.split('---')
-        if len(parts) < 3:
-            return False
-        
-        front_matter = parts[1].strip()
-        body = parts[2].strip()
-        
-        # Parse YAML
-        data = yaml.safe_load(front_matter)
-        if not data:
-            return False
-        
-        # Check for required fields
-        if 'name' not in data or 'description' not in data:
-            return False
-        
-        # Check if it's actually a subagent (not just any markdown)
-        name_lower = data['name'].lower()
-        description_lower = data['description'].lower()
-        
-        # More flexible validation - accept any file with name and description
-        # that has meaningful content and looks like an agent
-        if len(body.strip()) < 50:  # At least 50 characters of content
-            return False
-        
-        # Check if it has agent-like content (instructions, focus areas, etc.)
-        body_lower = body.lower()
-        agent_indicators = ['you are', 'focus', 'approach', 'output', 'specializing', 'expertise']
-        has_agent_content = any(indicator in body_lower for indicator in agent_indicators)
-        
-        if not has_agent_content:
-            return False
-        
-        return True
-        
-    except Exception:
-        return False
-
-def search_github_for_agents():
-    """Search GitHub for repositories containing Claude subagents"""
+# Remote agent files are streamed; anything larger than this is rejected
+MAX_AGENT_FILE_BYTES = int(os.getenv("MAX_AGENT_FILE_BYTES", str(256 * 1024)))
+FETCH_CHUNK_BYTES = 8192
+FETCH_TIMEOUT = 30
+
+# Per-client token bucket for endpoints that fan out to the GitHub API
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "5"))
+RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", "1"))
+# Least recently seen clients are evicted beyond this many buckets
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000"))
+# Proxies in front of the app that append to X-Forwarded-For. 0 (the default)
+# ignores the header and uses the peer address; the Cloud Run and Railway
+# deploy configs set 1, since their edge appends the real client address
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+# How long /search-github results are reused before querying GitHub again
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", "600"))
+
+def search_github_for_agents(failed_patterns: list = None):
+    """Search GitHub for repositories containing Claude subagents
+
+    Patterns whose query fails are appended to failed_patterns when given.
+    """
     discovered_repos = []
     
     for pattern in GITHUB_SEARCH_PATTERNS:
@@ -151,12 +130,18 @@ def search_github_for_agents():
                     }
                     discovered_repos.append(repo_info)
                     print(f"🔍 Found potential agent repo: {repo['owner']['login']}/{repo['name']} ({repo['stargazers_count']} stars)")
+            else:
+                print(f"Error searching for pattern '{pattern}': {response.status_code}")
+                if failed_patterns is not None:
+                    failed_patterns.append(pattern)
             
             # Rate limiting - GitHub allows 30 requests per minute for unauthenticated requests
             time.sleep(2)
             
         except Exception as e:
             print(f"Error searching for pattern '{pattern}': {str(e)}")
+            if failed_patterns is not None:
+                failed_patterns.append(pattern)
             continue
     
     return discovered_repos
@@ -226,8 +211,21 @@ def discover_agents_in_repo(owner: str, repo: str, branch: str = "main", path: s
         print(f"Error discovering agents in {owner}/{repo}: {str(e)}")
         return []
 
+def get_repo_stars(owner: str, repo: str) -> int:
+    """Look up a repository's star count, 0 if it can't be fetched"""
+    try:
+        response = requests.get(f"https://api.github.com/repos/{owner}/{repo}", headers={
+            "Accept": "application/vnd.github.v3+json",
+            "User-Agent": "Claude-Subagents-Marketplace"
+        }, timeout=FETCH_TIMEOUT)
+        if response.status_code == 200:
+            return response.json().get("stargazers_count", 0)
+    except Exception as e:
+        print(f"Error fetching stars for {owner}/{repo}: {str(e)}")
+    return 0
+
 def get_all_agent_urls():
-    """Get all agent URLs from all configured repositories"""
+    """Get (url, stars) pairs for agent files in all configured repositories"""
     all_urls = []
     for repo_config in REPOSITORIES_TO_SCAN:
         urls = discover_agents_in_repo(
@@ -236,12 +234,14 @@ def get_all_agent_urls():
             repo_config["branch"],
             repo_config["path"]
         )
-        all_urls.extend(urls)
+        if urls:
+            stars = get_repo_stars(repo_config["owner"], repo_config["repo"])
+            all_urls.extend((url, stars) for url in urls)
         print(f"Discovered {len(urls)} agents in {repo_config['owner']}/{repo_config['repo']}")
     return all_urls
 
 def get_github_wide_agents():
-    """Get agents from GitHub-wide search"""
+    """Get (url, stars) pairs for agent files found by GitHub-wide search"""
     print("🌐 Starting GitHub-wide agent discovery...")
     
     # Search for agent repositories
@@ -261,7 +261,9 @@ def get_github_wide_agents():
                 repo.get("path", "")
             )
             if urls:
-                all_urls.extend(urls)
+                # Search results carry stars already; trending repos need a lookup
+                stars = repo["stars"] if "stars" in repo else get_repo_stars(repo["owner"], repo["repo"])
+                all_urls.extend((url, stars) for url in urls)
                 print(f"✅ Found {len(urls)} agents in {repo['owner']}/{repo['repo']}")
         except Exception as e:
             print(f"❌ Error scanning {repo['owner']}/{repo['repo']}: {str(e)}")
@@ -287,24 +289,173 @@ def verify_token(request: Request):
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid Firebase token")
 
-@app.get("/agents", response_model=List[Subagent])
-def list_agents(q: str = Query(default=None, description="Optional search query")):
-    agents = []
-    for directory in SUBAGENTS_DIRS:
-        for filepath in glob.glob(f"{directory}/*.md"):
-            with open(filepath, "r") as f:
-                content = f.read()
+# --- Rate Limiting & Request Coalescing ---
+rate_limit_buckets = OrderedDict()  # client -> (tokens, last_refill), least recent first
+rate_limit_lock = threading.Lock()
+in_flight_requests = {}  # key -> {"done": Event, "result": ..., "error": ...}
+in_flight_lock = threading.Lock()
+
+def client_id(request: Request) -> str:
+    # Cloud Run / Railway sit behind a proxy that appends the real peer address
+    # on the right; anything further left is client-supplied and can be spoofed
+    forwarded = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+    if TRUSTED_PROXY_HOPS > 0 and len(forwarded) >= TRUSTED_PROXY_HOPS:
+        return forwarded[-TRUSTED_PROXY_HOPS]
+    return request.client.host if request.client else "unknown"
+
+def rate_limit(request: Request):
+    """Spend one token from the caller's bucket or reject with 429"""
+    refill_per_second = RATE_LIMIT_PER_MINUTE / 60
+    client = client_id(request)
+    now = time.monotonic()
+    
+    with rate_limit_lock:
+        tokens, last_refill = rate_limit_buckets.pop(client, (RATE_LIMIT_BURST, now))
+        tokens = min(RATE_LIMIT_BURST, tokens + (now - last_refill) * refill_per_second)
+        
+        # Re-inserting moves the client to the most recent end; evict the oldest
+        while len(rate_limit_buckets) >= RATE_LIMIT_MAX_CLIENTS:
+            rate_limit_buckets.popitem(last=False)
+        
+        if tokens < 1:
+            rate_limit_buckets[client] = (tokens, now)
+            retry_after = math.ceil((1 - tokens) / refill_per_second) if refill_per_second > 0 else 60
+            raise HTTPException(
+                status_code=429,
+                detail="Rate limit exceeded, try again later",
+                headers={"Retry-After": str(retry_after)}
+            )
+        rate_limit_buckets[client] = (tokens - 1, now)
+
+def coalesced(key: str):
+    """Share one execution between identical concurrent calls.
+
+    The first caller runs the function; callers arriving while it is still in
+    flight wait for and receive the same result (or exception).
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with in_flight_lock:
+                entry = in_flight_requests.get(key)
+                leader = entry is None
+                if leader:
+                    entry = {"done": threading.Event(), "result": None, "error": None}
+                    in_flight_requests[key] = entry
+            
+            if not leader:
+                print(f"🔗 Joining in-flight {key} request")
+                entry["done"].wait()
+            else:
+                try:
+                    entry["result"] = fn(*args, **kwargs)
+                except Exception as e:
+                    entry["error"] = e
+                finally:
+                    with in_flight_lock:
+                        del in_flight_requests[key]
+                    entry["done"].set()
+            
+            if entry["error"] is not None:
+                raise entry["error"]
+            return entry["result"]
+        return wrapper
+    return decorator
+
+# --- Agent Catalog Index ---
+# Parsed agents plus a tool facet index (normalized tool name -> agent ids),
+# rebuilt only when the agent files on disk change. Each build is a new snapshot
+# that is never mutated, so readers always see one consistent build.
+agent_index = {"signature": None, "agents": (), "tool_facets": {}, "facet_counts": []}
+agent_index_lock = threading.Lock()
+
+def normalize_tool_name(tool) -> str:
+    return str(tool).strip().lower()
+
+def agent_files_signature():
+    """(path, mtime) for every agent file, skipping files removed mid-scan"""
+    signature = []
+    for path in sorted(path for directory in SUBAGENTS_DIRS for path in glob.glob(f"{directory}/*.md")):
+        try:
+            signature.append((path, os.stat(path).st_mtime_ns))
+        except FileNotFoundError:
+            continue
+    return tuple(signature)
+
+def get_agent_index():
+    """Return the current agent index snapshot, rebuilding it if any agent file was added, removed or modified"""
+    global agent_index
+    signature = agent_files_signature()
+    
+    with agent_index_lock:
+        if agent_index["signature"] == signature:
+            return agent_index
+        
+        agents = []
+        tool_facets = {}
+        tool_labels = {}
+        for filepath, _ in signature:
+            try:
+                with open(filepath, "r") as f:
+                    content = f.read()
+            except FileNotFoundError:
+                continue
             try:
                 front_matter = content.split('---')[1]
                 body = content.split('---')[2].strip()
                 data = yaml.safe_load(front_matter)
                 agent = Subagent(name=data['name'], description=data['description'], tools=data['tools'], content=body)
-                if not q or q.lower() in agent.name.lower() or q.lower() in agent.description.lower() or any(q.lower() in t.lower() for t in agent.tools):
-                    agents.append(agent)
             except Exception as e:
                 raise HTTPException(status_code=500, detail=f"Failed to parse {filepath}: {str(e)}")
+            
+            agent_id = len(agents)
+            agents.append(agent)
+            for tool in agent.tools:
+                key = normalize_tool_name(tool)
+                tool_facets.setdefault(key, set()).add(agent_id)
+                tool_labels.setdefault(key, tool.strip())
+        
+        agent_index = {
+            "signature": signature,
+            "agents": tuple(agents),
+            "tool_facets": {key: frozenset(ids) for key, ids in tool_facets.items()},
+            "facet_counts": sorted(
+                ({"tool": tool_labels[key], "count": len(ids)} for key, ids in tool_facets.items()),
+                key=lambda facet: (-facet["count"], facet["tool"].lower())
+            )
+        }
+        return agent_index
+
+@app.get("/agents", response_model=List[Subagent])
+def list_agents(
+    q: str = Query(default=None, description="Optional search query"),
+    tools: List[str] = Query(default=None, description="Only agents that have all of these tools")
+):
+    index = get_agent_index()
+    agent_ids = range(len(index["agents"]))
+    
+    if tools:
+        # Accept both ?tools=Read&tools=Bash and ?tools=Read,Bash
+        wanted = {normalize_tool_name(t) for value in tools for t in value.split(',') if t.strip()}
+        matches = [index["tool_facets"].get(tool, frozenset()) for tool in wanted]
+        agent_ids = sorted(frozenset.intersection(*matches)) if matches else agent_ids
+    
+    agents = []
+    for agent_id in agent_ids:
+        agent = index["agents"][agent_id]
+        if not q or q.lower() in agent.name.lower() or q.lower() in agent.description.lower() or any(q.lower() in t.lower() for t in agent.tools):
+            agents.append(agent)
     return agents
 
+@app.get("/facets")
+def list_facets():
+    """Tool facet counts for rendering catalog filters"""
+    index = get_agent_index()
+    return {
+        "tools": index["facet_counts"],
+        "total_agents": len(index["agents"])
+    }
+
 @app.get("/agents/{agent_name}/download")
 def download_agent(agent_name: str):
     """Download the full markdown content of a specific agent"""
@@ -399,115 +550,156 @@ def like_agent(agent_name: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to update likes: {str(e)}")
 
-@app.post("/import")
-def import_from_github():
-    # Ensure community_agents directory exists
-    os.makedirs("community_agents", exist_ok=True)
+def front_matter_rejection(head: str, complete: bool):
+    """Cheap checks on the start of a file.
+
+    Returns a skip reason, "" once the front matter looks fine, or None while
+    more of the file is needed to decide.
+    """
+    head = head.lstrip("\ufeff \t\r\n")
+    if len(head) < 3:
+        return "No YAML frontmatter found" if complete else None
+    if not head.startswith('---'):
+        return "No YAML frontmatter found"
     
-    print("🔍 Discovering agents from repositories...")
-    all_urls = get_all_agent_urls()
-    print(f"📦 Found {len(all_urls)} potential agent files")
+    end = head.find('---', 3)
+    if end == -1:
+        return "No YAML frontmatter found" if complete else None
     
+    front_matter = head[3:end]
+    for field in ("name", "description"):
+        if not re.search(rf"^[ \t]*[\"']?{field}[\"']?[ \t]*:", front_matter, re.MULTILINE):
+            return "Missing required fields"
+    return ""
+
+def fetch_agent_file(url: str):
+    """Stream a remote agent file, stopping as soon as it can be rejected.
+
+    Returns (content, None) on success, (None, skip_reason) for files that are
+    not agents, and raises for HTTP or network errors.
+    """
+    with requests.get(url, stream=True, timeout=FETCH_TIMEOUT) as response:
+        if response.status_code != 200:
+            raise requests.HTTPError(response.status_code)
+        
+        content_length = response.headers.get("Content-Length")
+        if content_length and int(content_length) > MAX_AGENT_FILE_BYTES:
+            return None, f"File too large ({content_length} bytes)"
+        
+        buffer = bytearray()
+        decided = False
+        for chunk in response.iter_content(chunk_size=FETCH_CHUNK_BYTES):
+            buffer.extend(chunk)
+            if len(buffer) > MAX_AGENT_FILE_BYTES:
+                return None, f"File too large (over {MAX_AGENT_FILE_BYTES} bytes)"
+            if not decided:
+                reason = front_matter_rejection(buffer.decode("utf-8", errors="ignore"), complete=False)
+                if reason:
+                    return None, reason
+                decided = reason == ""
+        
+        content = buffer.decode(response.encoding or "utf-8", errors="replace")
+        if not decided:
+            reason = front_matter_rejection(content, complete=True)
+            if reason:
+                return None, reason
+        return content, None
+
+def fetch_agent_files(sources, failed: list):
+    """Fetch (url, stars) sources, yielding (url, content, source) for files that pass the early checks.
+
+    source carries the discovery index and repo stars through the pool for dedupe.
+    """
+    for index, (url, stars) in enumerate(sources):
+        try:
+            content, skip_reason = fetch_agent_file(url)
+            if skip_reason:
+                print(f"⚠️  Skipping {url}: {skip_reason}")
+                continue
+            yield url, content, {"index": index, "stars": stars}
+        except requests.HTTPError as e:
+            failed.append(url)
+            print(f"❌ Failed to fetch {url}: {str(e)}")
+        except Exception as e:
+            failed.append(url)
+            print(f"❌ Error importing from {url}: {str(e)}")
+            continue
+
+def run_import_pipeline(sources, submitted_by: str):
+    """Fetch, normalize (in parallel), dedupe and write agents.
+
+    Returns (imported, failed, duplicates).
+    """
     imported = []
     failed = []
+    valid = []
+    
+    # Workers only validate/normalize; all file and Firestore writes stay here.
+    # Results stream back as chunks finish but are held until the whole batch
+    # is in, so duplicates can be collapsed before anything is written.
+    for result in normalize_agent_files(fetch_agent_files(sources, failed)):
+        url = result["url"]
+        if "skipped" in result:
+            print(f"⚠️  Skipping {url}: {result['skipped']}")
+            continue
+        if "error" in result:
+            failed.append(url)
+            print(f"❌ Error importing from {url}: {result['error']}")
+            continue
+        valid.append(result)
+    
+    # Collapse forks and mirrors before writing anything
+    canonical, duplicates = dedupe_agents(valid)
+    for result in duplicates:
+        print(f"♻️  Skipping {result['url']}: {result['duplicate_reason']} with {result['duplicate_of']}")
     
-    for url in all_urls:
+    for result in canonical:
+        url = result["url"]
         try:
-            response = requests.get(url)
-            if response.status_code == 200:
-                content = response.text
-                
-                # Check if it has YAML frontmatter (basic validation)
-                if '---' not in content or content.count('---') < 2:
-                    print(f"⚠️  Skipping {url}: No YAML frontmatter found")
-                    continue
-                
-                # Validate if this is actually a subagent file
-                if not is_valid_subagent_file(content):
-                    print(f"⚠️  Skipping {url}: Not a valid Claude subagent file")
-                    continue
-                
-                front_matter = content.split('---')[1]
-                body = content.split('---')[2].strip()
-                data = yaml.safe_load(front_matter)
-                
-                # Validate required fields
-                if not data or 'name' not in data or 'description' not in data:
-                    print(f"⚠️  Skipping {url}: Missing required fields")
-                    continue
-                
-                # Add default tools if not present
-                if 'tools' not in data:
-                    # Intelligently assign tools based on agent type
-                    agent_name = data['name'].lower()
-                    if 'code' in agent_name or 'review' in agent_name:
-                        data['tools'] = ['Read', 'Grep', 'Bash', 'Git']
-                    elif 'debug' in agent_name:
-                        data['tools'] = ['Read', 'Grep', 'Bash', 'Python', 'JavaScript']
-                    elif 'python' in agent_name:
-                        data['tools'] = ['Read', 'Python', 'Pip', 'Virtualenv']
-                    elif 'javascript' in agent_name or 'js' in agent_name:
-                        data['tools'] = ['Read', 'JavaScript', 'TypeScript', 'Node.js']
-                    elif 'data' in agent_name or 'scientist' in agent_name:
-                        data['tools'] = ['Read', 'Python', 'R', 'SQL', 'Jupyter']
-                    elif 'ml' in agent_name or 'machine' in agent_name:
-                        data['tools'] = ['Read', 'Python', 'TensorFlow', 'PyTorch', 'Scikit-learn']
-                    elif 'security' in agent_name or 'audit' in agent_name:
-                        data['tools'] = ['Read', 'Grep', 'Bash', 'Security']
-                    elif 'devops' in agent_name or 'ops' in agent_name:
-                        data['tools'] = ['Read', 'Grep', 'Bash', 'Docker', 'Kubernetes']
-                    elif 'content' in agent_name or 'writer' in agent_name:
-                        data['tools'] = ['Read', 'Write', 'Markdown', 'HTML']
-                    else:
-                        data['tools'] = ['Read', 'Grep', 'Bash']
-                
-                # Ensure tools is always a list
-                if isinstance(data['tools'], str):
-                    # Convert comma-separated string to list
-                    data['tools'] = [tool.strip() for tool in data['tools'].split(',')]
-                elif not isinstance(data['tools'], list):
-                    data['tools'] = ['Read', 'Grep', 'Bash']  # Default fallback
-                
-                # Create filename with proper naming
-                filename = f"community_agents/{data['name'].lower().replace(' ', '-').replace('_', '-')}.md"
-                
-                # Reconstruct the content with proper YAML
-                new_content = f"---\nname: {data['name']}\ndescription: {data['description']}\ntools:\n"
-                for tool in data['tools']:
-                    new_content += f"  - {tool}\n"
-                new_content += f"---\n\n{body}"
-                
-                with open(filename, "w") as f:
-                    f.write(new_content)
-                
-                if db is not None:
-                    db.collection("agents").document(data['name']).set({
-                        "description": data['description'],
-                        "tools": data['tools'],
-                        "submitted_by": "import-script",
-                        "likes": 0,
-                        "source_url": url
-                    })
-                
-                imported.append(data['name'])
-                print(f"✅ Imported: {data['name']}")
-            else:
-                failed.append(url)
-                print(f"❌ Failed to fetch {url}: {response.status_code}")
+            with open(result["filename"], "w") as f:
+                f.write(result["content"])
+            
+            if db is not None:
+                db.collection("agents").document(result["name"]).set({
+                    "description": result["description"],
+                    "tools": result["tools"],
+                    "submitted_by": submitted_by,
+                    "likes": 0,
+                    "source_url": url
+                })
+            
+            imported.append(result["name"])
+            print(f"✅ Imported: {result['name']}")
         except Exception as e:
             failed.append(url)
             print(f"❌ Error importing from {url}: {str(e)}")
             continue
     
-    print(f"🎉 Import complete: {len(imported)} successful, {len(failed)} failed")
+    return imported, failed, [result["url"] for result in duplicates]
+
+@app.post("/import", dependencies=[Depends(rate_limit)])
+@coalesced("import")
+def import_from_github():
+    # Ensure community_agents directory exists
+    os.makedirs("community_agents", exist_ok=True)
+    
+    print("🔍 Discovering agents from repositories...")
+    all_urls = get_all_agent_urls()
+    print(f"📦 Found {len(all_urls)} potential agent files")
+    
+    imported, failed, duplicates = run_import_pipeline(all_urls, "import-script")
+    
+    print(f"🎉 Import complete: {len(imported)} successful, {len(failed)} failed, {len(duplicates)} duplicates")
     return {
         "imported": imported,
         "failed": failed,
+        "duplicates": duplicates,
         "total_discovered": len(all_urls),
         "success_rate": f"{len(imported)}/{len(all_urls)}"
     }
 
-@app.post("/import-github-wide")
+@app.post("/import-github-wide", dependencies=[Depends(rate_limit)])
+@coalesced("import-github-wide")
 def import_from_github_wide():
     """Import agents from GitHub-wide search"""
     # Ensure community_agents directory exists
@@ -517,100 +709,13 @@ def import_from_github_wide():
     all_urls = get_github_wide_agents()
     print(f"📦 Found {len(all_urls)} potential agent files from GitHub-wide search")
     
-    imported = []
-    failed = []
+    imported, failed, duplicates = run_import_pipeline(all_urls, "github-wide-scan")
     
-    for url in all_urls:
-        try:
-            response = requests.get(url)
-            if response.status_code == 200:
-                content = response.text
-                
-                # Check if it has YAML frontmatter (basic validation)
-                if '---' not in content or content.count('---') < 2:
-                    print(f"⚠️  Skipping {url}: No YAML frontmatter found")
-                    continue
-                
-                # Validate if this is actually a subagent file
-                if not is_valid_subagent_file(content):
-                    print(f"⚠️  Skipping {url}: Not a valid Claude subagent file")
-                    continue
-                
-                front_matter = content.split('---')[1]
-                body = content.split('---')[2].strip()
-                data = yaml.safe_load(front_matter)
-                
-                # Validate required fields
-                if not data or 'name' not in data or 'description' not in data:
-                    print(f"⚠️  Skipping {url}: Missing required fields")
-                    continue
-                
-                # Add default tools if not present
-                if 'tools' not in data:
-                    # Intelligently assign tools based on agent type
-                    agent_name = data['name'].lower()
-                    if 'code' in agent_name or 'review' in agent_name:
-                        data['tools'] = ['Read', 'Grep', 'Bash', 'Git']
-                    elif 'debug' in agent_name:
-                        data['tools'] = ['Read', 'Grep', 'Bash', 'Python', 'JavaScript']
-                    elif 'python' in agent_name:
-                        data['tools'] = ['Read', 'Python', 'Pip', 'Virtualenv']
-                    elif 'javascript' in agent_name or 'js' in agent_name:
-                        data['tools'] = ['Read', 'JavaScript', 'TypeScript', 'Node.js']
-                    elif 'data' in agent_name or 'scientist' in agent_name:
-                        data['tools'] = ['Read', 'Python', 'R', 'SQL', 'Jupyter']
-                    elif 'ml' in agent_name or 'machine' in agent_name:
-                        data['tools'] = ['Read', 'Python', 'TensorFlow', 'PyTorch', 'Scikit-learn']
-                    elif 'security' in agent_name or 'audit' in agent_name:
-                        data['tools'] = ['Read', 'Grep', 'Bash', 'Security']
-                    elif 'devops' in agent_name or 'ops' in agent_name:
-                        data['tools'] = ['Read', 'Grep', 'Bash', 'Docker', 'Kubernetes']
-                    elif 'content' in agent_name or 'writer' in agent_name:
-                        data['tools'] = ['Read', 'Write', 'Markdown', 'HTML']
-                    else:
-                        data['tools'] = ['Read', 'Grep', 'Bash']
-                
-                # Ensure tools is always a list
-                if isinstance(data['tools'], str):
-                    # Convert comma-separated string to list
-                    data['tools'] = [tool.strip() for tool in data['tools'].split(',')]
-                elif not isinstance(data['tools'], list):
-                    data['tools'] = ['Read', 'Grep', 'Bash']  # Default fallback
-                
-                # Create filename with proper naming
-                filename = f"community_agents/{data['name'].lower().replace(' ', '-').replace('_', '-')}.md"
-                
-                # Reconstruct the content with proper YAML
-                new_content = f"---\nname: {data['name']}\ndescription: {data['description']}\ntools:\n"
-                for tool in data['tools']:
-                    new_content += f"  - {tool}\n"
-                new_content += f"---\n\n{body}"
-                
-                with open(filename, "w") as f:
-                    f.write(new_content)
-                
-                if db is not None:
-                    db.collection("agents").document(data['name']).set({
-                        "description": data['description'],
-                        "tools": data['tools'],
-                        "submitted_by": "github-wide-scan",
-                        "likes": 0,
-                        "source_url": url
-                })
-                imported.append(data['name'])
-                print(f"✅ Imported: {data['name']}")
-            else:
-                failed.append(url)
-                print(f"❌ Failed to fetch {url}: {response.status_code}")
-        except Exception as e:
-            failed.append(url)
-            print(f"❌ Error importing from {url}: {str(e)}")
-            continue
-    
-    print(f"🎉 GitHub-wide import complete: {len(imported)} successful, {len(failed)} failed")
+    print(f"🎉 GitHub-wide import complete: {len(imported)} successful, {len(failed)} failed, {len(duplicates)} duplicates")
     return {
         "imported": imported,
         "failed": failed,
+        "duplicates": duplicates,
         "total_discovered": len(all_urls),
         "success_rate": f"{len(imported)}/{len(all_urls)}",
         "source": "github-wide-search"
@@ -669,22 +774,43 @@ def list_repositories():
         "total": len(REPOSITORIES_TO_SCAN)
     }
 
+# Last /search-github result, reused until it expires or the patterns change
+search_cache = {"patterns": None, "expires_at": 0, "result": None}
+
+@coalesced("search-github")
+def run_github_search():
+    """Run every search pattern against GitHub, caching the summary if all queries succeeded"""
+    global search_cache
+    patterns = tuple(GITHUB_SEARCH_PATTERNS)
+    failed_patterns = []
+    discovered_repos = search_github_for_agents(failed_patterns)
+    trending_repos = scan_github_trending()
+    
+    all_repos = discovered_repos + trending_repos
+    
+    result = {
+        "discovered_repositories": len(discovered_repos),
+        "trending_repositories": len(trending_repos),
+        "total_repositories": len(all_repos),
+        "repositories": all_repos[:20],  # Return first 20 for preview
+        "search_patterns": list(patterns)
+    }
+    # Don't pin a partial result (e.g. GitHub rate-limiting us) for the whole TTL
+    if not failed_patterns:
+        search_cache = {"patterns": patterns, "expires_at": time.time() + SEARCH_CACHE_TTL, "result": result}
+    return result
+
 @app.get("/search-github")
-def search_github_repositories():
+def search_github_repositories(request: Request):
     """Search GitHub for potential agent repositories"""
+    cached = search_cache
+    if cached["patterns"] == tuple(GITHUB_SEARCH_PATTERNS) and time.time() < cached["expires_at"]:
+        return cached["result"]
+    
+    # Only cache misses cost a token, since only they call GitHub
+    rate_limit(request)
     try:
-        discovered_repos = search_github_for_agents()
-        trending_repos = scan_github_trending()
-        
-        all_repos = discovered_repos + trending_repos
-        
-        return {
-            "discovered_repositories": len(discovered_repos),
-            "trending_repositories": len(trending_repos),
-            "total_repositories": len(all_repos),
-            "repositories": all_repos[:20],  # Return first 20 for preview
-            "search_patterns": GITHUB_SEARCH_PATTERNS
-        }
+        return run_github_search()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to search GitHub: {str(e)}")
 
@@ -762,6 +888,9 @@ def startup_import():
     except Exception as e:
         print(f"⚠️ Startup import failed: {str(e)}")
 
-# Start background scheduler and initial import
-threading.Thread(target=background_scheduler, daemon=True).start()
-threading.Thread(target=startup_import, daemon=True).start()
+# Start background scheduler and initial import once the server is up
+# (not at import time, so import-pool worker processes don't re-run them)
+@app.on_event("startup")
+def start_background_jobs():
+    threading.Thread(target=background_scheduler, daemon=True).start()
+    threading.Thread(target=startup_import, daemon=True).start()